@@ -1,14 +1,22 @@
 import os
+import glob
+import math
+import functools
+import shutil
+import struct
+import subprocess
+import tempfile
+import threading
 import numpy as np
-from pydub import AudioSegment
-import soundfile as sf
-from scipy.signal import lfilter
-import wave
-from tempfile import NamedTemporaryFile
-from typing import Optional
+from typing import BinaryIO, Optional, Tuple, Union
 import logging
 from dataclasses import dataclass
 
+try:
+    from numba import njit, prange, types
+except ImportError:  # Fall back to the NumPy effect chain
+    njit = None
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -16,6 +24,189 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Samples handled by one parallel block of the fused kernel
+KERNEL_CHUNK_SIZE = 1 << 16
+
+# Decoded PCM cache, keyed by a hash of the source file
+PCM_CACHE_DIR = os.path.join(tempfile.gettempdir(), '8d_pcm_cache')
+PCM_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+if njit is not None:
+    # Concrete kernel signatures, compiled eagerly at import (and cached on
+    # disk) so the first conversion in a fresh worker does not pay for JIT
+    # compilation. Decoded and cached PCM arrive as read-only int16 buffers.
+    KERNEL_SIGNATURES = [
+        types.int16[:, ::1](samples, types.float64, types.float64, types.int64, types.int64, types.float64)
+        for samples in (types.int16[:, ::1], types.Array(types.int16, 2, 'C', readonly=True))
+    ]
+
+    @njit(KERNEL_SIGNATURES, parallel=True, fastmath=True, cache=True)
+    def _process(samples, pan_speed, depth, sample_rate, lag, decay):
+        """Pan, reverb, normalize and quantize to int16 stereo in two passes.
+
+        Mirrors _apply_panning, _apply_reverb and the peak normalization in
+        Audio8DConverter, reading the decoded int16 samples directly. Mono
+        input (a single column) is panned to stereo.
+        """
+        n = samples.shape[0]
+        last = samples.shape[1] - 1
+        n_chunks = (n + KERNEL_CHUNK_SIZE - 1) // KERNEL_CHUNK_SIZE
+        omega = 2.0 * math.pi * pan_speed / sample_rate
+        k = 2.0 * math.cos(omega)
+        wet = 0.5 * decay
+
+        mixed = np.empty((n, 2), dtype=np.float32)
+        peaks = np.zeros(n_chunks, dtype=np.float32)
+        for c in prange(n_chunks):
+            start = c * KERNEL_CHUNK_SIZE
+            stop = min(start + KERNEL_CHUNK_SIZE, n)
+
+            # sin(omega * i) via s[i + 1] = k * s[i] - s[i - 1], seeded in
+            # closed form per block so blocks stay independent. The second
+            # oscillator tracks the pan gain at the reverb tap, i - lag.
+            s_prev = math.sin(omega * (start - 1))
+            s_curr = math.sin(omega * start)
+            d_prev = math.sin(omega * (start - lag - 1))
+            d_curr = math.sin(omega * (start - lag))
+
+            peak = 0.0
+            for i in range(start, stop):
+                pan = depth * s_curr
+                left = 1.5 * samples[i, 0] * (1.0 + pan)
+                right = 1.5 * samples[i, last] * (1.0 - pan)
+                if i >= lag:
+                    pan_delayed = depth * d_curr
+                    left += wet * samples[i - lag, 0] * (1.0 + pan_delayed)
+                    right += wet * samples[i - lag, last] * (1.0 - pan_delayed)
+                mixed[i, 0] = left
+                mixed[i, 1] = right
+                peak = max(peak, abs(left), abs(right))
+
+                s_prev, s_curr = s_curr, k * s_curr - s_prev
+                d_prev, d_curr = d_curr, k * d_curr - d_prev
+            peaks[c] = peak
+
+        peak = 0.0
+        for c in range(n_chunks):
+            peak = max(peak, peaks[c])
+        scale = 32767.0 / peak if peak > 0.0 else 0.0
+
+        out = np.empty((n, 2), dtype=np.int16)
+        for i in prange(n):
+            out[i, 0] = np.int16(mixed[i, 0] * scale)
+            out[i, 1] = np.int16(mixed[i, 1] * scale)
+        return out
+else:
+    _process = None
+
+# numba's workqueue threading layer (used when neither TBB nor OpenMP is
+# available) aborts the process if two threads launch parallel kernels at
+# once, so kernel calls from concurrent conversions are serialized
+_process_lock = threading.Lock()
+
+def _run_ffmpeg(args: list, input: Optional[memoryview] = None) -> bytes:
+    """Run an ffmpeg command and return its stdout."""
+    result = subprocess.run(
+        args, input=input, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    if result.returncode != 0:
+        message = result.stderr.decode(errors="replace").strip()
+        raise RuntimeError(f"{os.path.basename(args[0])} failed: {message}")
+    return result.stdout
+
+def _parse_wav(data: bytes) -> Optional[Tuple[np.ndarray, int]]:
+    """Return (samples, sample_rate) from a piped 16-bit PCM WAV, if valid.
+
+    ffmpeg cannot seek back to fill in sizes when writing to a pipe, so the
+    data chunk is taken to run to the end of the stream.
+    """
+    if len(data) < 12 or data[:4] != b'RIFF' or data[8:12] != b'WAVE':
+        return None
+
+    channels = sample_rate = None
+    pos = 12
+    while pos + 8 <= len(data):
+        chunk_id = data[pos:pos + 4]
+        size, = struct.unpack_from('<I', data, pos + 4)
+        body = pos + 8
+        if chunk_id == b'fmt ':
+            channels, sample_rate = struct.unpack_from('<HI', data, body + 2)
+        elif chunk_id == b'data':
+            if not channels:
+                return None
+            frames = (len(data) - body) // (2 * channels)
+            samples = np.frombuffer(data, dtype=np.int16, count=frames * channels, offset=body)
+            return samples.reshape(-1, channels), sample_rate
+        pos = body + size + (size & 1)
+    return None
+
+def _pan_curve(length: int, omega: float, depth: float) -> np.ndarray:
+    """Return depth * sin(omega * i) for i in range(length) as float32."""
+    # Index in float64 so positions stay exact beyond 2**24 samples
+    curve = np.arange(length, dtype=np.float64)
+    curve *= omega
+    np.sin(curve, out=curve)
+    curve *= depth
+    return curve.astype(np.float32)
+
+@functools.lru_cache(maxsize=8)
+def _pan_lut(period: int, depth: float) -> np.ndarray:
+    """Return one period of the float32 pan curve, shared between calls."""
+    lut = _pan_curve(period, 2 * np.pi / period, depth)
+    lut.flags.writeable = False
+    return lut
+
+def _read_pcm_cache(cache_key: str) -> Optional[Tuple[np.ndarray, int]]:
+    """Return cached (samples, sample_rate) for cache_key, if present."""
+    for path in glob.glob(os.path.join(PCM_CACHE_DIR, f"{cache_key}_*.npy")):
+        sample_rate = int(os.path.basename(path)[len(cache_key) + 1:-len(".npy")])
+        try:
+            samples = np.load(path, mmap_mode='r')
+            os.utime(path)  # Mark as recently used
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable cache entry {path}: {str(e)}")
+            continue
+        return samples, sample_rate
+    return None
+
+def _write_pcm_cache(cache_key: str, samples: np.ndarray, sample_rate: int) -> None:
+    """Cache decoded samples, evicting least recently used entries."""
+    try:
+        os.makedirs(PCM_CACHE_DIR, exist_ok=True)
+        path = os.path.join(PCM_CACHE_DIR, f"{cache_key}_{sample_rate}.npy")
+        f = tempfile.NamedTemporaryFile(dir=PCM_CACHE_DIR, suffix='.tmp', delete=False)
+        try:
+            with f:
+                np.save(f, samples)
+            os.replace(f.name, path)
+        except BaseException:
+            # Don't leave partial files behind, e.g. when the disk is full
+            try:
+                os.unlink(f.name)
+            except OSError:
+                pass
+            raise
+
+        entries = []
+        for entry in glob.glob(os.path.join(PCM_CACHE_DIR, "*.npy")):
+            try:
+                stat = os.stat(entry)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total <= PCM_CACHE_MAX_BYTES:
+                break
+            try:
+                os.remove(entry)
+            except FileNotFoundError:
+                pass
+            total -= size
+    except OSError as e:
+        logger.warning(f"Could not write PCM cache: {str(e)}")
+
 @dataclass
 class AudioConfig:
     """Configuration class for 8D audio conversion parameters."""
@@ -26,7 +217,10 @@ class AudioConfig:
 
 class Audio8DConverter:
     """Class to convert regular audio to 8D audio effect."""
-    
+
+    # Resolved ffmpeg binary, located once per process
+    _ffmpeg_path: Optional[str] = None
+
     def __init__(self, config: AudioConfig = None):
         """Initialize the 8D audio converter with optional configuration."""
         self.config = config if config is not None else AudioConfig()
@@ -35,21 +229,36 @@ class Audio8DConverter:
 
     def _check_ffmpeg(self) -> None:
         """Check if ffmpeg is installed and accessible."""
+        if Audio8DConverter._ffmpeg_path:
+            return
+
         try:
-            # Try multiple possible ffmpeg paths
+            # Try PATH first, then common install locations
             ffmpeg_paths = [
-                "ffmpeg",
                 "/usr/bin/ffmpeg",
                 "/usr/local/bin/ffmpeg",
                 "/opt/homebrew/bin/ffmpeg"
             ]
-            
-            for path in ffmpeg_paths:
-                result = os.system(f"{path} -version > /dev/null 2>&1")
-                if result == 0:
+
+            candidates = [shutil.which("ffmpeg")] + ffmpeg_paths
+            for path in candidates:
+                if not path or not os.access(path, os.X_OK):
+                    continue
+
+                # Make sure the binary actually runs; no shell involved
+                try:
+                    result = subprocess.run(
+                        [path, "-version"],
+                        stdout=subprocess.DEVNULL,
+                        stderr=subprocess.DEVNULL
+                    )
+                except OSError:
+                    continue
+                if result.returncode == 0:
                     logger.info("FFmpeg is installed and accessible.")
+                    Audio8DConverter._ffmpeg_path = path
                     return
-    
+
             raise RuntimeError(
                 "ffmpeg not found. Please install ffmpeg:\n"
                 "Windows: choco install ffmpeg\n"
@@ -73,35 +282,132 @@ class Audio8DConverter:
 
     def _apply_panning(self, audio_data: np.ndarray, sample_rate: int) -> np.ndarray:
         """Apply panning effect to the audio."""
-        duration = len(audio_data) / sample_rate
-        t = np.linspace(0, duration, len(audio_data))
-        pan_curve = np.sin(2 * np.pi * self.config.pan_speed * t) * self.config.depth
+        # Tile one cached float32 period of the pan curve over the signal.
+        # A period longer than the signal is computed directly instead, so
+        # the table never exceeds the signal length.
+        period = int(round(sample_rate / self.config.pan_speed))
+        if period <= len(audio_data):
+            pan_curve = np.resize(_pan_lut(period, self.config.depth), len(audio_data))
+        else:
+            omega = 2 * np.pi * self.config.pan_speed / sample_rate
+            pan_curve = _pan_curve(len(audio_data), omega, self.config.depth)
+
+        # Mono input (1-D or a single column) feeds both channels as a view
+        if audio_data.ndim == 1:
+            audio_data = audio_data[:, np.newaxis]
 
-        if len(audio_data.shape) == 1:
-            audio_data = np.stack([audio_data, audio_data], axis=1)
+        # Write both channels straight into the stereo output. The left gain
+        # is built in the output column and the right gain reuses pan_curve,
+        # so no 1 +/- pan_curve temporaries are allocated.
+        panned = np.empty((len(audio_data), 2), dtype=np.float32)
+        np.add(pan_curve, 1, out=panned[:, 0])
+        np.multiply(panned[:, 0], audio_data[:, 0], out=panned[:, 0])
+        np.subtract(1, pan_curve, out=pan_curve)
+        np.multiply(audio_data[:, -1], pan_curve, out=panned[:, 1])
 
-        left_channel = audio_data[:, 0] * (1 + pan_curve)
-        right_channel = audio_data[:, 1] * (1 - pan_curve)
-        
-        return np.stack([left_channel, right_channel], axis=1)
+        return panned
 
     def _apply_reverb(self, audio_data: np.ndarray, sample_rate: int) -> np.ndarray:
         """Apply reverb effect to the audio."""
         delay_samples = int(self.config.reverb_delay * sample_rate / 1000)
         decay = self.config.reverb_decay
 
-        ir = np.zeros(delay_samples)
-        ir[0] = 1
-        ir[delay_samples-1] = decay
+        # The impulse response is just a dry tap at 0 and a decayed tap at
+        # delay_samples - 1, so apply it as a shifted add instead of lfilter.
+        # Dry signal plus half the filtered signal gives 1.5x dry.
+        lag = delay_samples - 1
+        audio_reverb = audio_data * 1.5
+        audio_reverb[lag:] += (0.5 * decay) * audio_data[:len(audio_data) - lag]
+
+        return audio_reverb
+
+    def _apply_effects(self, samples: np.ndarray, sample_rate: int) -> np.ndarray:
+        """Apply panning and reverb to int16 samples, then normalize to int16 stereo."""
+        if _process is not None:
+            # The kernel converts each int16 sample as it reads it; the
+            # output is peak-normalized, so no input scaling is needed
+            delay_samples = int(self.config.reverb_delay * sample_rate / 1000)
+            with _process_lock:
+                return _process(
+                    np.ascontiguousarray(samples),
+                    self.config.pan_speed,
+                    self.config.depth,
+                    sample_rate,
+                    delay_samples - 1,
+                    self.config.reverb_decay
+                )
+
+        # Convert to float32 and normalize
+        audio_data = samples.astype(np.float32)
+        audio_data *= 1.0 / 32768.0
+
+        audio_data = self._apply_panning(audio_data, sample_rate)
+        audio_data = self._apply_reverb(audio_data, sample_rate)
+
+        # Normalize to prevent clipping, scaling in place so the peak search
+        # and the int16 cast are the only other passes over the buffer
+        peak = max(float(audio_data.max()), -float(audio_data.min()))
+        scale = 32767.0 / peak if peak > 0 else 0.0
+        audio_data *= np.float32(scale)
+
+        return audio_data.astype(np.int16)
+
+    def _load_samples(self, input_path: str, cache_key: Optional[str] = None) -> Tuple[np.ndarray, int]:
+        """Decode an audio file to int16 samples of shape (frames, channels).
 
-        audio_reverb = np.zeros_like(audio_data)
-        for i in range(audio_data.shape[1]):
-            audio_reverb[:, i] = lfilter(ir, [1], audio_data[:, i])
+        When cache_key is given, decoded samples are reused from and stored in
+        the on-disk PCM cache.
+        """
+        if cache_key is not None:
+            cached = _read_pcm_cache(cache_key)
+            if cached is not None:
+                logger.info(f"Using cached PCM for {input_path}")
+                return cached
 
-        return audio_data + audio_reverb * 0.5
+        # A single ffmpeg run decodes the first audio stream, downmixed to
+        # stereo, as a WAV whose header carries the sample rate, so no
+        # separate ffprobe is needed
+        result = subprocess.run([
+            Audio8DConverter._ffmpeg_path, "-hide_banner", "-nostdin", "-nostats",
+            "-v", "info", "-i", input_path, "-map", "0:a:0?", "-ac", "2",
+            "-f", "wav", "-acodec", "pcm_s16le", "-"
+        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        log = result.stderr.decode(errors="replace")
+        decoded = _parse_wav(result.stdout)
 
-    def convert_file(self, input_path: str, output_path: str) -> bool:
-        """Convert a regular MP3 file to 8D audio."""
+        # The input opened but had no audio stream to map
+        if decoded is None and "Input #0" in log:
+            raise ValueError("No audio stream in input")
+        if result.returncode != 0 or decoded is None:
+            message = log.strip().splitlines()[-1] if log.strip() else "unknown error"
+            raise RuntimeError(f"ffmpeg failed: {message}")
+
+        samples, sample_rate = decoded
+
+        if cache_key is not None:
+            _write_pcm_cache(cache_key, samples, sample_rate)
+        return samples, sample_rate
+
+    def _save_samples(self, audio_data: np.ndarray, sample_rate: int, output: Union[str, BinaryIO]) -> None:
+        """Encode int16 stereo samples to a 320k MP3 file path or binary stream."""
+        to_stream = not isinstance(output, str)
+        mp3 = _run_ffmpeg([
+            Audio8DConverter._ffmpeg_path, "-v", "error", "-y",
+            "-f", "s16le", "-ar", str(sample_rate), "-ac", "2", "-i", "-",
+            "-b:a", "320k", "-f", "mp3", "-" if to_stream else output
+        ], input=memoryview(np.ascontiguousarray(audio_data)).cast('B'))
+
+        if to_stream:
+            output.write(mp3)
+
+    def convert_file(self, input_path: str, output: Union[str, BinaryIO], cache_key: Optional[str] = None) -> bool:
+        """Convert a regular MP3 file to 8D audio.
+
+        output is either a file path or a writable binary stream such as
+        io.BytesIO. cache_key identifies the input's contents (e.g. a hash of
+        the file) so repeat conversions with different parameters can skip
+        decoding.
+        """
         try:
             if not os.path.exists(input_path):
                 raise FileNotFoundError(f"Input file not found: {input_path}")
@@ -112,59 +418,26 @@ class Audio8DConverter:
             logger.info(f"Converting file: {input_path}")
 
             # Create output directory if it doesn't exist
-            os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+            if isinstance(output, str):
+                os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
 
-            # Load audio file using pydub
-            audio = AudioSegment.from_mp3(input_path)
-            
-            # Convert to numpy array
-            samples = np.array(audio.get_array_of_samples())
-            
-            # Handle both mono and stereo
-            if audio.channels == 1:
-                samples = samples.reshape(-1, 1)
-            else:
-                samples = samples.reshape(-1, 2)
-            
-            # Convert to float32 and normalize
-            audio_data = samples.astype(np.float32) / np.iinfo(samples.dtype).max
-
-            # Apply effects
-            audio_data = self._apply_panning(audio_data, audio.frame_rate)
-            audio_data = self._apply_reverb(audio_data, audio.frame_rate)
-
-            # Normalize to prevent clipping
-            audio_data = audio_data / np.max(np.abs(audio_data))
-
-            # Scale back to int16
-            audio_data = (audio_data * 32767).astype(np.int16)
-
-            # Save as temporary WAV first
-            with NamedTemporaryFile(delete=False, suffix='.wav') as temp_wav:
-                with wave.open(temp_wav.name, 'wb') as wav_file:
-                    wav_file.setnchannels(2)  # Always stereo output
-                    wav_file.setsampwidth(2)  # 16-bit
-                    wav_file.setframerate(audio.frame_rate)
-                    wav_file.writeframes(audio_data.tobytes())
-
-                # Convert WAV to MP3 using pydub
-                AudioSegment.from_wav(temp_wav.name).export(
-                    output_path, 
-                    format='mp3',
-                    bitrate='320k'
-                )
+            # Decode straight to int16 samples, one column per channel
+            samples, sample_rate = self._load_samples(input_path, cache_key)
 
-            # Clean up temporary file
-            os.unlink(temp_wav.name)
-            
-            logger.info(f"Successfully converted file: {output_path}")
+            # Apply effects, normalize and scale back to int16
+            audio_data = self._apply_effects(samples, sample_rate)
+
+            # Encode to MP3 by piping the PCM straight into ffmpeg
+            self._save_samples(audio_data, sample_rate, output)
+
+            logger.info(f"Successfully converted file: {input_path}")
             return True
 
         except Exception as e:
             logger.error(f"Error converting file: {str(e)}")
             raise
 
-def convert_to_8d(input_file: str, output_file: str, config: Optional[AudioConfig] = None) -> bool:
+def convert_to_8d(input_file: str, output_file: Union[str, BinaryIO], config: Optional[AudioConfig] = None) -> bool:
     """Convenience function to convert an MP3 file to 8D audio."""
     converter = Audio8DConverter(config)
     return converter.convert_file(input_file, output_file)
@@ -1,7 +1,13 @@
 # app.py
-from flask import Flask, request, send_file, jsonify
+from flask import Flask, request, send_file, jsonify, url_for
 from werkzeug.utils import secure_filename
 import os
+import io
+import hashlib
+import uuid
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from another import Audio8DConverter, AudioConfig
 import logging
 from datetime import datetime
@@ -17,21 +23,73 @@ app = Flask(__name__)
 
 # Configuration
 UPLOAD_FOLDER = 'uploads'
-PROCESSED_FOLDER = 'processed'
 ALLOWED_EXTENSIONS = {'mp3'}
 
 # Create required directories
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-os.makedirs(PROCESSED_FOLDER, exist_ok=True)
 
 # Configure maximum file size (16MB)
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-app.config['PROCESSED_FOLDER'] = PROCESSED_FOLDER
+
+# Conversions run off the request thread; clients poll /result/<job_id>.
+# Jobs live in this process, so the app must run as a single gunicorn worker.
+# Each running job holds its decoded PCM and a growing MP3 in memory, and the
+# effects kernel is serialized anyway, so only a couple run at once and new
+# uploads are refused once enough are queued behind them.
+MAX_RUNNING_JOBS = 2
+MAX_PENDING_JOBS = 8
+executor = ThreadPoolExecutor(max_workers=MAX_RUNNING_JOBS)
+jobs = {}
+jobs_lock = threading.Lock()
+
+# Finished jobs nobody collected are forgotten after this many seconds, and
+# the oldest are dropped early once their in-memory MP3s exceed the byte cap
+JOB_TTL_SECONDS = 10 * 60
+MAX_RESULT_BYTES = 256 * 1024 * 1024
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def finish_job(job, future):
+    """Record when a background job finished and how much memory it holds."""
+    if future.exception() is None:
+        job['size'] = future.result().getbuffer().nbytes
+    job['finished_at'] = time.time()
+
+def release_job(job_id):
+    """Remove a job and drop its reference to the in-memory result."""
+    job = jobs.pop(job_id)
+    job['future'] = None
+
+def evict_finished_jobs():
+    """Forget finished jobs that were not collected in time or exceed the cap."""
+    cutoff = time.time() - JOB_TTL_SECONDS
+    with jobs_lock:
+        finished = sorted(
+            (job['finished_at'], job_id) for job_id, job in jobs.items()
+            if job['finished_at'] is not None
+        )
+        total = sum(jobs[job_id]['size'] for _, job_id in finished)
+        for finished_at, job_id in finished:
+            if finished_at >= cutoff and total <= MAX_RESULT_BYTES:
+                break
+            total -= jobs[job_id]['size']
+            release_job(job_id)
+
+def run_conversion(converter, input_path, cache_key):
+    """Convert an uploaded file in the background and remove the upload.
+
+    The processed MP3 is kept in memory rather than written to disk.
+    """
+    output = io.BytesIO()
+    try:
+        converter.convert_file(input_path, output, cache_key=cache_key)
+    finally:
+        os.remove(input_path)
+    output.seek(0)
+    return output
+
 @app.route('/')
 def home():
     return '''
@@ -63,7 +121,7 @@ def home():
             <div class="container">
                 <h1>8D Audio Converter</h1>
                 <p>Upload an MP3 file to convert it to 8D audio.</p>
-                <form action="/convert" method="post" enctype="multipart/form-data">
+                <form id="convert-form" action="/convert" method="post" enctype="multipart/form-data">
                     <div>
                         <input type="file" name="file" accept=".mp3" required>
                     </div>
@@ -94,7 +152,36 @@ def home():
                         <input type="submit" value="Convert to 8D">
                     </div>
                 </form>
+                <p id="status"></p>
             </div>
+            <script>
+                const form = document.getElementById('convert-form');
+                const status = document.getElementById('status');
+                const sleep = ms => new Promise(resolve => setTimeout(resolve, ms));
+
+                form.addEventListener('submit', async event => {
+                    event.preventDefault();
+                    status.textContent = 'Uploading...';
+                    let response = await fetch(form.action, { method: 'POST', body: new FormData(form) });
+                    if (response.status === 202) {
+                        const job = await response.json();
+                        status.textContent = 'Converting...';
+                        do {
+                            await sleep(1000);
+                            response = await fetch(job.status_url);
+                        } while (response.status === 202);
+                    }
+                    if (!response.ok) {
+                        status.textContent = 'Error: ' + (await response.json()).error;
+                        return;
+                    }
+                    const link = document.createElement('a');
+                    link.href = URL.createObjectURL(await response.blob());
+                    link.download = form.file.files[0].name.slice(0, -'.mp3'.length) + '_8d.mp3';
+                    link.click();
+                    status.textContent = 'Done!';
+                });
+            </script>
         </body>
     </html>
     '''
@@ -115,13 +202,25 @@ def convert_audio():
         if not allowed_file(file.filename):
             return jsonify({'error': 'Invalid file type. Only MP3 files are allowed'}), 400
 
+        # Refuse work beyond the queue limit instead of buffering it
+        evict_finished_jobs()
+        with jobs_lock:
+            pending = sum(job['finished_at'] is None for job in jobs.values())
+        if pending >= MAX_PENDING_JOBS:
+            return jsonify({'error': 'Server is busy, please try again later'}), 503
+
         # Secure the filename and generate paths
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = secure_filename(file.filename)
         base_filename = os.path.splitext(filename)[0]
         
-        input_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{base_filename}_{timestamp}.mp3")
-        output_path = os.path.join(app.config['PROCESSED_FOLDER'], f"{base_filename}_{timestamp}_8d.mp3")
+        # The job id keeps queued uploads of the same name from colliding
+        job_id = uuid.uuid4().hex
+        input_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{base_filename}_{timestamp}_{job_id}.mp3")
+
+        # Hash the upload so repeat conversions can reuse its decoded audio
+        cache_key = hashlib.blake2b(file.stream.read(), digest_size=16).hexdigest()
+        file.stream.seek(0)
 
         # Save the uploaded file
         file.save(input_path)
@@ -135,25 +234,53 @@ def convert_audio():
             reverb_decay=float(request.form.get('reverb_decay', 0.3))
         )
 
-        # Convert the file
+        # Queue the conversion and let the client poll for the result
         converter = Audio8DConverter(config)
-        converter.convert_file(input_path, output_path)
-        
-        # Clean up the input file
-        os.remove(input_path)
-        
-        # Send the processed file
-        return send_file(
-            output_path,
-            as_attachment=True,
-            download_name=f"{base_filename}_8d.mp3",
-            mimetype='audio/mpeg'
-        )
+        job = {
+            'future': executor.submit(run_conversion, converter, input_path, cache_key),
+            'download_name': f"{base_filename}_8d.mp3",
+            'finished_at': None,
+            'size': 0
+        }
+        with jobs_lock:
+            jobs[job_id] = job
+        job['future'].add_done_callback(lambda future: finish_job(job, future))
+
+        return jsonify({
+            'job_id': job_id,
+            'status_url': url_for('get_result', job_id=job_id)
+        }), 202
 
     except Exception as e:
         logger.error(f"Error in conversion: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/result/<job_id>')
+def get_result(job_id):
+    evict_finished_jobs()
+    with jobs_lock:
+        job = jobs.get(job_id)
+        if job is None:
+            return jsonify({'error': 'Unknown job'}), 404
+
+        future = job['future']
+        if not future.done():
+            return jsonify({'status': 'processing'}), 202
+
+        release_job(job_id)
+    error = future.exception()
+    if error is not None:
+        logger.error(f"Error in conversion: {str(error)}")
+        return jsonify({'error': str(error)}), 500
+
+    # Send the processed file
+    return send_file(
+        future.result(),
+        as_attachment=True,
+        download_name=job['download_name'],
+        mimetype='audio/mpeg'
+    )
+
 @app.errorhandler(413)
 def too_large(e):
     return jsonify({'error': 'File is too large. Maximum size is 16MB'}), 413